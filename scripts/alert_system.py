@@ -4,34 +4,112 @@ SPARKCHAIN Alert System
 Monitors market conditions and triggers alerts
 """
 
-import json
 import os
 import time
 from datetime import datetime
 from typing import Dict, List, Any
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from json_io import json_dumps, json_loads
+
+def create_session() -> requests.Session:
+    """Create an HTTP session with keep-alive connection pooling and retries"""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 502, 503, 504], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_SESSION = create_session()
+
+def _compile_price_predicate(alert: Dict):
+    """Build a closure for a price alert with symbol, condition and threshold
+    bound once; returns None for non-price or malformed alerts"""
+    if alert.get("type", "price") != "price":
+        return None
+    try:
+        symbol = alert.get("symbol", "").upper()
+        condition = alert.get("condition", "above")
+        threshold = float(alert.get("value", 0))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    
+    if condition == "above":
+        def predicate(coin_index):
+            coin = coin_index.get(symbol)
+            return bool(coin) and coin.get("price", 0) > threshold
+    elif condition == "below":
+        def predicate(coin_index):
+            coin = coin_index.get(symbol)
+            return bool(coin) and coin.get("price", 0) < threshold
+    elif condition == "crosses_above":
+        def predicate(coin_index):
+            coin = coin_index.get(symbol)
+            if not coin:
+                return False
+            current_price = coin.get("price", 0)
+            previous_price = alert.get("last_price", current_price)
+            alert["last_price"] = current_price
+            return previous_price <= threshold < current_price
+    elif condition == "crosses_below":
+        def predicate(coin_index):
+            coin = coin_index.get(symbol)
+            if not coin:
+                return False
+            current_price = coin.get("price", 0)
+            previous_price = alert.get("last_price", current_price)
+            alert["last_price"] = current_price
+            return previous_price >= threshold > current_price
+    else:
+        def predicate(coin_index):
+            return False
+    
+    return predicate
 
 class AlertSystem:
+    LOG_LIMIT = 1000
+    
     def __init__(self, data_dir="data"):
         self.data_dir = data_dir
         self.alerts_file = os.path.join(data_dir, "alerts.json")
+        self.log_file = os.path.join(data_dir, "alert_log.jsonl")
+        self.legacy_log_file = os.path.join(data_dir, "alert_log.json")
+        self.sentiment_file = os.path.join(data_dir, "sentiment.json")
         self.alerts = self.load_alerts()
+        self._dirty = False
+        self._log_cache = None
+        self._log_lines = 0
+        self._log_needs_newline = False
+        self._sentiment_cache = (0, None)
+        # id(alert) -> (alert, (type, symbol, condition, value), compiled predicate);
+        # recompiled whenever those alert fields change
+        self._predicates = {}
         
     def load_alerts(self) -> List[Dict]:
         """Load saved alerts from file"""
         try:
             if os.path.exists(self.alerts_file):
-                with open(self.alerts_file, 'r') as f:
-                    return json.load(f)
+                with open(self.alerts_file, 'rb') as f:
+                    return json_loads(f.read())
         except:
             pass
         return []
     
     def save_alerts(self):
-        """Save alerts to file"""
+        """Save alerts to file (write to temp file, then atomically replace)"""
         os.makedirs(self.data_dir, exist_ok=True)
-        with open(self.alerts_file, 'w') as f:
-            json.dump(self.alerts, f, indent=2)
+        tmp_file = self.alerts_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(json_dumps(self.alerts))
+        os.replace(tmp_file, self.alerts_file)
+        self._dirty = False
+    
+    def flush(self):
+        """Save alerts if they or their evaluator state changed since the last save"""
+        if self._dirty:
+            self.save_alerts()
     
     def create_alert(self, alert_data: Dict) -> str:
         """Create a new alert"""
@@ -45,80 +123,83 @@ class AlertSystem:
             **alert_data
         }
         self.alerts.append(alert)
+        self._get_predicate(alert)
         self.save_alerts()
         return alert_id
     
     def check_alerts(self, market_data: Dict) -> List[Dict]:
         """Check all alerts against current market data"""
         triggered_alerts = []
+        coin_index = self.build_coin_index(market_data)
+        now_iso = datetime.now().isoformat()
         
         for alert in self.alerts:
             if not alert.get("active") or alert.get("triggered"):
                 continue
             
-            if self.evaluate_alert(alert, market_data):
+            # Evaluators track last_price / avg_volume on the alert itself
+            state = (alert.get("last_price"), alert.get("avg_volume"))
+            if self.evaluate_alert(alert, market_data, coin_index):
                 alert["triggered"] = True
-                alert["triggered_at"] = datetime.now().isoformat()
+                alert["triggered_at"] = now_iso
                 triggered_alerts.append(alert)
+                self._dirty = True
+            elif state != (alert.get("last_price"), alert.get("avg_volume")):
+                self._dirty = True
         
+        self.flush()
         if triggered_alerts:
-            self.save_alerts()
             self.log_triggered_alerts(triggered_alerts)
         
         return triggered_alerts
     
-    def evaluate_alert(self, alert: Dict, market_data: Dict) -> bool:
+    @staticmethod
+    def build_coin_index(market_data: Dict) -> Dict[str, Dict]:
+        """Index trending coins by symbol (first occurrence wins)"""
+        coin_index = {}
+        for coin in market_data.get("trending_coins", []):
+            coin_index.setdefault(coin["symbol"], coin)
+        return coin_index
+    
+    def evaluate_alert(self, alert: Dict, market_data: Dict, coin_index: Dict = None) -> bool:
         """Evaluate if an alert condition is met"""
-        alert_type = alert.get("type", "price")
-        
-        if alert_type == "price":
-            return self.evaluate_price_alert(alert, market_data)
-        elif alert_type == "volume":
-            return self.evaluate_volume_alert(alert, market_data)
-        elif alert_type == "change":
-            return self.evaluate_change_alert(alert, market_data)
-        elif alert_type == "sentiment":
-            return self.evaluate_sentiment_alert(alert, market_data)
-        
-        return False
+        evaluator = self._EVALUATORS.get(alert.get("type", "price"))
+        if evaluator is None:
+            return False
+        return evaluator(self, alert, market_data, coin_index)
     
-    def evaluate_price_alert(self, alert: Dict, market_data: Dict) -> bool:
+    def _get_predicate(self, alert: Dict):
+        """Get the compiled predicate for an alert, compiling it on first use or after an edit"""
+        definition = (alert.get("type"), alert.get("symbol"), alert.get("condition"), alert.get("value"))
+        entry = self._predicates.get(id(alert))
+        if entry is None or entry[0] is not alert or entry[1] != definition:
+            entry = (alert, definition, _compile_price_predicate(alert))
+            self._predicates[id(alert)] = entry
+        return entry[2]
+    
+    def _prune_predicates(self):
+        """Drop compiled predicates of alerts that no longer exist"""
+        live = {id(alert) for alert in self.alerts}
+        self._predicates = {k: v for k, v in self._predicates.items() if k in live}
+    
+    def evaluate_price_alert(self, alert: Dict, market_data: Dict, coin_index: Dict = None) -> bool:
         """Evaluate price-based alert"""
-        symbol = alert.get("symbol", "").upper()
-        condition = alert.get("condition", "above")
-        threshold = float(alert.get("value", 0))
-        
-        # Find coin in market data
-        coins = market_data.get("trending_coins", [])
-        coin = next((c for c in coins if c["symbol"] == symbol), None)
-        
-        if not coin:
+        predicate = self._get_predicate(alert)
+        if predicate is None:
             return False
         
-        current_price = coin.get("price", 0)
-        
-        if condition == "above":
-            return current_price > threshold
-        elif condition == "below":
-            return current_price < threshold
-        elif condition == "crosses_above":
-            previous_price = alert.get("last_price", current_price)
-            alert["last_price"] = current_price
-            return previous_price <= threshold < current_price
-        elif condition == "crosses_below":
-            previous_price = alert.get("last_price", current_price)
-            alert["last_price"] = current_price
-            return previous_price >= threshold > current_price
-        
-        return False
+        if coin_index is None:
+            coin_index = self.build_coin_index(market_data)
+        return predicate(coin_index)
     
-    def evaluate_volume_alert(self, alert: Dict, market_data: Dict) -> bool:
+    def evaluate_volume_alert(self, alert: Dict, market_data: Dict, coin_index: Dict = None) -> bool:
         """Evaluate volume-based alert"""
         symbol = alert.get("symbol", "").upper()
         threshold = float(alert.get("value", 0))
         
-        coins = market_data.get("trending_coins", [])
-        coin = next((c for c in coins if c["symbol"] == symbol), None)
+        if coin_index is None:
+            coin_index = self.build_coin_index(market_data)
+        coin = coin_index.get(symbol)
         
         if not coin:
             return False
@@ -134,14 +215,15 @@ class AlertSystem:
         
         return False
     
-    def evaluate_change_alert(self, alert: Dict, market_data: Dict) -> bool:
+    def evaluate_change_alert(self, alert: Dict, market_data: Dict, coin_index: Dict = None) -> bool:
         """Evaluate 24h change alert"""
         symbol = alert.get("symbol", "").upper()
         condition = alert.get("condition", "increase")
         threshold = float(alert.get("value", 0))
         
-        coins = market_data.get("trending_coins", [])
-        coin = next((c for c in coins if c["symbol"] == symbol), None)
+        if coin_index is None:
+            coin_index = self.build_coin_index(market_data)
+        coin = coin_index.get(symbol)
         
         if not coin:
             return False
@@ -157,14 +239,23 @@ class AlertSystem:
         
         return False
     
-    def evaluate_sentiment_alert(self, alert: Dict, market_data: Dict) -> bool:
+    def load_sentiment(self) -> Dict:
+        """Load sentiment data, re-parsing only when the file has changed"""
+        try:
+            mtime = os.stat(self.sentiment_file).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        
+        if mtime != self._sentiment_cache[0]:
+            with open(self.sentiment_file, 'rb') as f:
+                self._sentiment_cache = (mtime, json_loads(f.read()))
+        return self._sentiment_cache[1]
+    
+    def evaluate_sentiment_alert(self, alert: Dict, market_data: Dict, coin_index: Dict = None) -> bool:
         """Evaluate sentiment-based alert"""
         try:
-            sentiment_file = os.path.join(self.data_dir, "sentiment.json")
-            if os.path.exists(sentiment_file):
-                with open(sentiment_file, 'r') as f:
-                    sentiment_data = json.load(f)
-                
+            sentiment_data = self.load_sentiment()
+            if sentiment_data is not None:
                 threshold = float(alert.get("value", 50))
                 current_sentiment = sentiment_data.get("overall_sentiment", 50)
                 
@@ -177,21 +268,67 @@ class AlertSystem:
         
         return False
     
-    def log_triggered_alerts(self, alerts: List[Dict]):
-        """Log triggered alerts to file"""
-        log_file = os.path.join(self.data_dir, "alert_log.json")
-        log_data = []
-        
+    # Alert type -> evaluator, resolved once at class creation
+    _EVALUATORS = {
+        "price": evaluate_price_alert,
+        "volume": evaluate_volume_alert,
+        "change": evaluate_change_alert,
+        "sentiment": evaluate_sentiment_alert,
+    }
+    
+    def _load_log(self) -> List[Dict]:
+        """Load alert log (one JSON record per line) once and keep it in memory"""
+        if self._log_cache is None:
+            if not os.path.exists(self.log_file):
+                self._migrate_legacy_log()
+            
+            self._log_cache = []
+            self._log_lines = 0
+            line = b"\n"
+            try:
+                with open(self.log_file, 'rb') as f:
+                    for line in f:
+                        # Every line counts toward compaction, even one left
+                        # half-written by a crashed append
+                        self._log_lines += 1
+                        if line.strip():
+                            try:
+                                self._log_cache.append(json_loads(line))
+                            except ValueError:
+                                pass
+            except OSError:
+                pass
+            self._log_needs_newline = not line.endswith(b"\n")
+            del self._log_cache[:-self.LOG_LIMIT]
+        return self._log_cache
+    
+    def _migrate_legacy_log(self):
+        """Convert the old single-array alert_log.json into the line-delimited log"""
         try:
-            if os.path.exists(log_file):
-                with open(log_file, 'r') as f:
-                    log_data = json.load(f)
-        except:
-            pass
+            with open(self.legacy_log_file, 'rb') as f:
+                entries = json_loads(f.read())
+        except (OSError, ValueError):
+            return
+        
+        os.makedirs(self.data_dir, exist_ok=True)
+        self._rewrite_log(entries[-self.LOG_LIMIT:])
+    
+    def _rewrite_log(self, entries: List[Dict]):
+        """Replace the log file with entries (write to temp file, then atomically replace)"""
+        tmp_file = self.log_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.writelines(json_dumps(entry) + b"\n" for entry in entries)
+        os.replace(tmp_file, self.log_file)
+    
+    def log_triggered_alerts(self, alerts: List[Dict]):
+        """Append triggered alerts to the log file"""
+        log_data = self._load_log()
+        new_entries = []
+        now_iso = datetime.now().isoformat()
         
         for alert in alerts:
             log_entry = {
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": now_iso,
                 "alert_id": alert.get("id"),
                 "symbol": alert.get("symbol"),
                 "type": alert.get("type"),
@@ -199,13 +336,25 @@ class AlertSystem:
                 "value": alert.get("value"),
                 "triggered_value": self.get_triggered_value(alert)
             }
-            log_data.append(log_entry)
+            new_entries.append(log_entry)
         
-        # Keep only last 1000 entries
-        log_data = log_data[-1000:]
+        # Keep only the last LOG_LIMIT entries in memory
+        log_data.extend(new_entries)
+        del log_data[:-self.LOG_LIMIT]
         
-        with open(log_file, 'w') as f:
-            json.dump(log_data, f, indent=2)
+        os.makedirs(self.data_dir, exist_ok=True)
+        if self._log_lines + len(new_entries) > 2 * self.LOG_LIMIT:
+            # Compact the file once it holds twice the limit
+            self._rewrite_log(log_data)
+            self._log_lines = len(log_data)
+        else:
+            with open(self.log_file, 'ab') as f:
+                if self._log_needs_newline:
+                    # Terminate a partial last line so the new records stay parseable
+                    f.write(b"\n")
+                f.writelines(json_dumps(entry) + b"\n" for entry in new_entries)
+            self._log_lines += len(new_entries)
+        self._log_needs_newline = False
     
     def get_triggered_value(self, alert: Dict) -> Any:
         """Get the value that triggered the alert"""
@@ -228,15 +377,7 @@ class AlertSystem:
     
     def get_alert_history(self, limit: int = 50) -> List[Dict]:
         """Get alert history"""
-        try:
-            log_file = os.path.join(self.data_dir, "alert_log.json")
-            if os.path.exists(log_file):
-                with open(log_file, 'r') as f:
-                    log_data = json.load(f)
-                return log_data[-limit:]
-        except:
-            pass
-        return []
+        return self._load_log()[-limit:]
     
     def delete_alert(self, alert_id: str) -> bool:
         """Delete an alert"""
@@ -244,6 +385,7 @@ class AlertSystem:
         self.alerts = [a for a in self.alerts if a.get("id") != alert_id]
         
         if len(self.alerts) < original_count:
+            self._prune_predicates()
             self.save_alerts()
             return True
         return False
@@ -251,6 +393,7 @@ class AlertSystem:
     def clear_all_alerts(self):
         """Clear all alerts"""
         self.alerts = []
+        self._predicates = {}
         self.save_alerts()
 
 # Webhook notification function
@@ -270,7 +413,12 @@ def send_webhook_notification(webhook_url: str, alert: Dict):
             }]
         }
         
-        response = requests.post(webhook_url, json=payload, timeout=10)
+        response = _SESSION.post(
+            webhook_url,
+            data=json_dumps(payload),
+            headers={"Content-Type": "application/json"},
+            timeout=10
+        )
         return response.status_code == 200
     except:
         return False
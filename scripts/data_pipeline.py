@@ -5,12 +5,25 @@ Fetches data from multiple sources and generates comprehensive analytics
 """
 
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import mmap
 import os
+import re
 import sys
 from datetime import datetime, timedelta
 import numpy as np
-import pandas as pd
+from json_io import json_dumps, json_loads
+
+# Kernels are declared with explicit signatures so numba compiles them
+# eagerly at import (or loads them from its on-disk cache) instead of on the
+# first call in the middle of a run
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # Configuration
 CONFIG = {
@@ -26,9 +39,47 @@ CONFIG = {
     },
     "defillama_api": "https://api.llama.fi",
     "min_market_cap": 1000000,
-    "min_volume": 100000
+    "min_volume": 100000,
+    "pretty_json": False
 }
 
+def create_session() -> requests.Session:
+    """Create an HTTP session with keep-alive connection pooling and retries"""
+    session = requests.Session()
+    # The pipeline only issues GETs, so 500s are safe to retry as well
+    retry = Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=['GET'], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_SESSION = create_session()
+
+# PCG64 generator shared by the simulated components; draw in batches
+RNG = np.random.default_rng()
+
+TECH_FACTORS = ('Bullish pattern', 'Support level', 'Breakout potential', 'Low volatility')
+
+WHALE_ACTIVITY_TYPES = (
+    ("Large Buy", "bullish"),
+    ("Large Sell", "bearish"),
+    ("Exchange Transfer", "neutral"),
+    ("Wallet Accumulation", "bullish"),
+    ("Exchange Withdrawal", "bullish")
+)
+
+# Snapshot time shared by every record and file written in one run;
+# main() resets it so repeated runs in one process get their own time
+_run_time = None
+
+def run_time() -> datetime:
+    """Return this run's snapshot time, fixing it on first use"""
+    global _run_time
+    if _run_time is None:
+        _run_time = datetime.now()
+    return _run_time
+
 def safe_get(data, key, default=0):
     """Safely get value from dictionary, converting None to default"""
     value = data.get(key, default)
@@ -38,9 +89,37 @@ def fetch_coingecko_data():
     """Fetch comprehensive market data from CoinGecko"""
     try:
         url = f"{CONFIG['coingecko_api']}/coins/markets"
-        response = requests.get(url, params=CONFIG['coingecko_params'], timeout=30)
+        
+        # Revalidate the last payload with its ETag instead of re-downloading it
+        cache_dir = os.path.join(CONFIG['data_dir'], '.cache')
+        etag_file = os.path.join(cache_dir, 'coingecko.etag')
+        body_file = os.path.join(cache_dir, 'coingecko.json')
+        headers = {}
+        if os.path.exists(body_file) and os.path.exists(etag_file):
+            with open(etag_file, 'r') as f:
+                headers['If-None-Match'] = f.read().strip()
+        
+        response = _SESSION.get(url, params=CONFIG['coingecko_params'], headers=headers, timeout=30)
+        if response.status_code == 304:
+            try:
+                with open(body_file, 'rb') as f:
+                    return json_loads(f.read())
+            except (OSError, ValueError):
+                # Unreadable cache: drop it and fetch the full payload again
+                for path in (body_file, etag_file):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                response = _SESSION.get(url, params=CONFIG['coingecko_params'], timeout=30)
         response.raise_for_status()
-        return response.json()
+        
+        etag = response.headers.get('ETag')
+        if etag:
+            os.makedirs(cache_dir, exist_ok=True)
+            _atomic_write(body_file, response.content)
+            _atomic_write(etag_file, etag.encode())
+        return json_loads(response.content)
     except Exception as e:
         print(f"Error fetching CoinGecko data: {e}")
         return []
@@ -48,7 +127,7 @@ def fetch_coingecko_data():
 def fetch_defi_data():
     """Fetch DeFi data from DeFiLlama"""
     defi_data = {
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": run_time().isoformat(),
         "total_value_locked": 0,
         "top_protocols": [],
         "yield_opportunities": [],
@@ -57,18 +136,23 @@ def fetch_defi_data():
     }
     
     try:
+        # Issue both DeFiLlama requests at once; they are independent
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            tvl_future = pool.submit(_SESSION.get, f"{CONFIG['defillama_api']}/v2/historicalChainTvl", timeout=15)
+            protocols_future = pool.submit(_SESSION.get, f"{CONFIG['defillama_api']}/protocols", timeout=15)
+        
         # Fetch TVL data
-        response = requests.get(f"{CONFIG['defillama_api']}/v2/historicalChainTvl", timeout=15)
+        response = tvl_future.result()
         if response.status_code == 200:
-            chains = response.json()
+            chains = json_loads(response.content)
             total_tvl = sum(chain.get("tvl", 0) for chain in chains if chain.get("tvl"))
             defi_data["total_value_locked"] = total_tvl
         
         # Fetch top protocols
-        response = requests.get(f"{CONFIG['defillama_api']}/protocols", timeout=15)
+        response = protocols_future.result()
         if response.status_code == 200:
-            protocols = response.json()
-            top_protocols = sorted(protocols, key=lambda x: x.get("tvl", 0), reverse=True)[:10]
+            protocols = json_loads(response.content)
+            top_protocols = heapq.nlargest(10, protocols, key=lambda x: x.get("tvl", 0))
             
             for protocol in top_protocols:
                 defi_data["top_protocols"].append({
@@ -80,18 +164,29 @@ def fetch_defi_data():
                     "url": protocol.get("url", "")
                 })
         
-        # Generate yield opportunities (simulated)
-        yield_assets = ["USDC", "DAI", "ETH", "BTC", "SOL"]
-        protocols = ["Aave", "Compound", "Curve", "Lido", "Yearn"]
+        # Generate yield opportunities (simulated), drawing each column at once
+        yield_assets = ("USDC", "DAI", "ETH", "BTC", "SOL")
+        protocols = ("Aave", "Compound", "Curve", "Lido", "Yearn")
+        risk_levels = ("low", "medium", "high")
+        platforms = ("Ethereum", "Polygon", "Arbitrum", "Optimism")
+        count = 5
         
-        for i in range(5):
+        # Sample label indices as integers and map them through the tuples
+        asset_index = RNG.integers(0, len(yield_assets), size=count).tolist()
+        protocol_index = RNG.integers(0, len(protocols), size=count).tolist()
+        apys = RNG.uniform(2, 15, size=count).round(2).tolist()
+        risk_index = RNG.choice(len(risk_levels), size=count, p=[0.5, 0.3, 0.2]).tolist()
+        tvls = (RNG.uniform(10, 500, size=count) * 1000000).tolist()
+        platform_index = RNG.integers(0, len(platforms), size=count).tolist()
+        
+        for i in range(count):
             defi_data["yield_opportunities"].append({
-                "asset": np.random.choice(yield_assets),
-                "protocol": np.random.choice(protocols),
-                "apy": round(np.random.uniform(2, 15), 2),
-                "risk": np.random.choice(["low", "medium", "high"], p=[0.5, 0.3, 0.2]),
-                "tvl": np.random.uniform(10, 500) * 1000000,
-                "platform": np.random.choice(["Ethereum", "Polygon", "Arbitrum", "Optimism"])
+                "asset": yield_assets[asset_index[i]],
+                "protocol": protocols[protocol_index[i]],
+                "apy": apys[i],
+                "risk": risk_levels[risk_index[i]],
+                "tvl": tvls[i],
+                "platform": platforms[platform_index[i]]
             })
         
         # Calculate dominance
@@ -114,12 +209,14 @@ def fetch_defi_data():
 
 def fetch_market_sentiment():
     """Fetch market sentiment indicators"""
+    # Social, technical and derivatives readings in one draw
+    social, technical, derivatives = RNG.uniform([30, 40, 35], [70, 80, 75]).round(1).tolist()
     sentiment = {
-        "timestamp": datetime.now().isoformat(),
-        "fear_greed_index": np.random.randint(20, 80),
-        "social_sentiment": round(np.random.uniform(30, 70), 1),
-        "technical_sentiment": round(np.random.uniform(40, 80), 1),
-        "derivatives_sentiment": round(np.random.uniform(35, 75), 1),
+        "timestamp": run_time().isoformat(),
+        "fear_greed_index": int(RNG.integers(20, 80)),
+        "social_sentiment": social,
+        "technical_sentiment": technical,
+        "derivatives_sentiment": derivatives,
         "overall_sentiment": 0,
         "trend": "neutral",
         "indicators": {}
@@ -140,98 +237,112 @@ def fetch_market_sentiment():
         sentiment["trend"] = "bearish"
     
     # Generate technical indicators
+    rsi, macd = RNG.uniform([30, -2], [70, 2]).tolist()
+    volume_trend, market_strength = RNG.integers(0, 3, size=2).tolist()
     sentiment["indicators"] = {
-        "rsi": round(np.random.uniform(30, 70), 1),
-        "macd": round(np.random.uniform(-2, 2), 3),
-        "volume_trend": np.random.choice(["rising", "falling", "stable"]),
-        "market_strength": np.random.choice(["strong", "weak", "neutral"])
+        "rsi": round(rsi, 1),
+        "macd": round(macd, 3),
+        "volume_trend": ("rising", "falling", "stable")[volume_trend],
+        "market_strength": ("strong", "weak", "neutral")[market_strength]
     }
     
     return sentiment
 
-def calculate_spark_score(coin):
-    """Calculate comprehensive Spark Score (0-100)"""
-    scores = []
+def coin_column(coins, key):
+    """Extract a numeric field from a list of coin dicts as a float64 array"""
+    column = np.fromiter((safe_get(coin, key, 0) for coin in coins), dtype=np.float64, count=len(coins))
+    # None is already 0 via safe_get; a NaN in the feed is zeroed in one pass
+    return np.nan_to_num(column, copy=False, nan=0.0)
+
+def top_k_indices(values, k):
+    """Indices of the k largest values, largest first, ties in input order"""
+    n = len(values)
+    if n > k:
+        # Partition to find the k-th largest value, keeping every tie with it
+        kth = np.partition(values, n - k)[n - k]
+        candidates = np.flatnonzero(values >= kth)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order[:k]]
+
+# Spark Score tiers: a value strictly above thresholds[k-1] (and not above
+# thresholds[k]) earns scores[k], i.e. scores[searchsorted(thresholds, value)]
+CAP_THRESHOLDS = np.array([10000000, 100000000, 1000000000, 10000000000], dtype=np.float64)  # $10M .. $10B
+CAP_SCORES = np.array([2, 5, 8, 12, 15], dtype=np.int64)
+LIQUIDITY_THRESHOLDS = np.array([100000, 1000000, 10000000, 50000000], dtype=np.float64)  # $100K .. $50M
+LIQUIDITY_SCORES = np.array([0, 3, 6, 10, 15], dtype=np.int64)
+STABILITY_THRESHOLDS = np.array([1, 10, 100], dtype=np.float64)  # price in USD
+STABILITY_SCORES = np.array([3, 5, 7, 10], dtype=np.int64)
+
+if njit is not None:
+    @njit('int64[:](float64[:], float64[:], float64[:], float64[:])', cache=True)
+    def _spark_scores_jit(change_24h, market_cap, volume, price):
+        """Compiled per-coin loop of calculate_spark_scores"""
+        n = change_24h.shape[0]
+        scores = np.empty(n, dtype=np.int64)
+        for i in range(n):
+            mc = market_cap[i]
+            vol = volume[i]
+            
+            total = min(25.0, abs(change_24h[i]) * 0.25)
+            
+            if mc > 0 and vol > 0:
+                total += min(20.0, (vol / mc) * 100 * 2)
+            
+            total += CAP_SCORES[np.searchsorted(CAP_THRESHOLDS, mc)]
+            total += LIQUIDITY_SCORES[np.searchsorted(LIQUIDITY_THRESHOLDS, vol)]
+            total += STABILITY_SCORES[np.searchsorted(STABILITY_THRESHOLDS, price[i])]
+            
+            # Fixed community (6) and sentiment (3) points
+            total += 6
+            total += 3
+            scores[i] = min(100, int(total))
+        return scores
+else:
+    _spark_scores_jit = None
+
+def calculate_spark_scores(change_24h, market_cap, volume, price):
+    """Calculate Spark Scores (0-100) for arrays of coin metrics"""
+    if _spark_scores_jit is not None:
+        return _spark_scores_jit(change_24h, market_cap, volume, price)
     
     # Price momentum (0-25 points)
-    change_24h = safe_get(coin, 'price_change_percentage_24h', 0)
-    momentum_score = min(25, abs(change_24h) * 0.25)
-    scores.append(momentum_score)
+    momentum_score = np.minimum(25, np.abs(change_24h) * 0.25)
     
     # Volume health (0-20 points)
-    market_cap = safe_get(coin, 'market_cap', 0)
-    volume = safe_get(coin, 'total_volume', 0)
-    
-    if market_cap > 0 and volume > 0:
-        volume_ratio = (volume / market_cap) * 100
-        volume_score = min(20, volume_ratio * 2)
-        scores.append(volume_score)
-    
-    # Market position (0-15 points)
-    if market_cap > 10000000000:  # > $10B
-        cap_score = 15
-    elif market_cap > 1000000000:   # > $1B
-        cap_score = 12
-    elif market_cap > 100000000:    # > $100M
-        cap_score = 8
-    elif market_cap > 10000000:     # > $10M
-        cap_score = 5
-    else:
-        cap_score = 2
-    scores.append(cap_score)
-    
-    # Liquidity (0-15 points)
-    if volume > 50000000:   # > $50M
-        liquidity_score = 15
-    elif volume > 10000000: # > $10M
-        liquidity_score = 10
-    elif volume > 1000000:  # > $1M
-        liquidity_score = 6
-    elif volume > 100000:   # > $100K
-        liquidity_score = 3
-    else:
-        liquidity_score = 0
-    scores.append(liquidity_score)
-    
-    # Stability (0-10 points)
-    price = safe_get(coin, 'current_price', 0)
-    if price > 100:
-        stability_score = 10
-    elif price > 10:
-        stability_score = 7
-    elif price > 1:
-        stability_score = 5
-    else:
-        stability_score = 3
-    scores.append(stability_score)
-    
-    # Community & Development (0-10 points)
-    community_score = 6  # Would be calculated from GitHub, socials, etc.
-    scores.append(community_score)
-    
-    # Sentiment (0-5 points)
-    sentiment_score = 3  # Would be calculated from news/social sentiment
-    scores.append(sentiment_score)
-    
-    return min(100, int(sum(scores)))
+    has_volume = (market_cap > 0) & (volume > 0)
+    volume_ratio = np.divide(volume, market_cap, out=np.zeros_like(volume), where=has_volume) * 100
+    volume_score = np.minimum(20, volume_ratio * 2)
+    
+    # Market position (0-15 points), liquidity (0-15 points) and
+    # stability (0-10 points) via branchless tier lookups
+    cap_score = CAP_SCORES[np.searchsorted(CAP_THRESHOLDS, market_cap)]
+    liquidity_score = LIQUIDITY_SCORES[np.searchsorted(LIQUIDITY_THRESHOLDS, volume)]
+    stability_score = STABILITY_SCORES[np.searchsorted(STABILITY_THRESHOLDS, price)]
+    
+    # Community & Development (0-10 points) and Sentiment (0-5 points)
+    # would be calculated from GitHub, socials and news; fixed for now
+    community_score = 6
+    sentiment_score = 3
+    
+    total = momentum_score + volume_score + cap_score + liquidity_score + stability_score
+    total = total + community_score + sentiment_score
+    return np.minimum(100, total.astype(np.int64))
 
-def calculate_prediction_score(coin_data):
-    """Calculate AI prediction score (0-100)"""
-    score = 50  # Base score
+def _prediction_score_kernel(change_24h, volume24h, market_cap, price, ath, innovation):
+    """Numeric core of calculate_prediction_score (float inputs only)"""
+    score = 50.0  # Base score
     
     # Momentum factor (0-20 points)
-    change_24h = safe_get(coin_data, 'change24h', 0)
     if change_24h > 0:
-        score += min(20, change_24h * 0.4)
+        score += min(20.0, change_24h * 0.4)
     
     # Volume growth factor (0-15 points)
-    volume24h = safe_get(coin_data, 'volume24h', 0)
-    marketCap = safe_get(coin_data, 'marketCap', 1)
-    volume_ratio = volume24h / max(1, marketCap)
-    score += min(15, volume_ratio * 300)
+    volume_ratio = volume24h / max(1.0, market_cap)
+    score += min(15.0, volume_ratio * 300)
     
     # Market cap position (0-15 points)
-    market_cap = safe_get(coin_data, 'marketCap', 0)
     if 50000000 < market_cap < 500000000:  # Sweet spot for growth
         score += 15
     elif market_cap < 50000000:  # Micro-cap high risk/reward
@@ -242,91 +353,151 @@ def calculate_prediction_score(coin_data):
         score += 5
     
     # Technical factor (0-10 points)
-    price = safe_get(coin_data, 'price', 0)
-    ath = safe_get(coin_data, 'ath', 0)
     if price > ath * 0.7:
         score += 5
     
     # Random innovation factor (0-10 points)
-    score += np.random.uniform(0, 10)
+    score += innovation
     
-    return min(100, max(0, score))
+    return min(100.0, max(0.0, score))
+
+if njit is not None:
+    _prediction_score_kernel = njit('float64(float64, float64, float64, float64, float64, float64)',
+                                    cache=True)(_prediction_score_kernel)
 
-def predict_future_change(coin_data):
-    """Predict future price changes"""
-    market_cap = safe_get(coin_data, 'marketCap', 0)
-    volatility_factor = 0.12 if market_cap > 1000000000 else 0.25
+def calculate_prediction_score(coin_data, innovation=None):
+    """Calculate AI prediction score (0-100), optionally with a pre-drawn innovation factor"""
+    if innovation is None:
+        innovation = RNG.uniform(0, 10)
+    return _prediction_score_kernel(
+        float(safe_get(coin_data, 'change24h', 0)),
+        float(safe_get(coin_data, 'volume24h', 0)),
+        float(safe_get(coin_data, 'marketCap', 0)),
+        float(safe_get(coin_data, 'price', 0)),
+        float(safe_get(coin_data, 'ath', 0)),
+        float(innovation)
+    )
+
+if njit is not None:
+    @njit('float64[:](float64[:], float64[:], float64[:], float64[:], float64[:], float64[:])', cache=True)
+    def _prediction_scores_jit(change_24h, volume24h, market_cap, price, ath, innovation):
+        """Compiled batch loop over _prediction_score_kernel"""
+        n = change_24h.shape[0]
+        scores = np.empty(n, dtype=np.float64)
+        for i in range(n):
+            scores[i] = _prediction_score_kernel(change_24h[i], volume24h[i], market_cap[i],
+                                                 price[i], ath[i], innovation[i])
+        return scores
+else:
+    _prediction_scores_jit = None
+
+def calculate_prediction_scores(change_24h, volume24h, market_cap, price, ath, innovation):
+    """Calculate AI prediction scores (0-100) for arrays of coin metrics"""
+    if _prediction_scores_jit is not None:
+        return _prediction_scores_jit(change_24h, volume24h, market_cap, price, ath, innovation)
+    
+    # Same terms, in the same order, as _prediction_score_kernel
+    score = np.full(change_24h.shape, 50.0)
+    score = score + np.where(change_24h > 0, np.minimum(20.0, change_24h * 0.4), 0.0)
+    score = score + np.minimum(15.0, volume24h / np.maximum(1.0, market_cap) * 300)
+    score = score + np.select(
+        [(market_cap > 50000000) & (market_cap < 500000000), market_cap < 50000000, market_cap < 5000000000],
+        [15.0, 10.0, 8.0],
+        5.0
+    )
+    score = score + np.where(price > ath * 0.7, 5.0, 0.0)
+    score = score + innovation
+    return np.minimum(100.0, np.maximum(0.0, score))
+
+if njit is not None:
+    @njit('UniTuple(float64[:], 2)(float64[:], float64[:], float64[:], float64[:])', cache=True)
+    def _future_changes_jit(change_24h, market_cap, noise_7d, noise_30d):
+        """Compiled per-coin loop of predict_future_changes"""
+        n = change_24h.shape[0]
+        changes_7d = np.empty(n, dtype=np.float64)
+        changes_30d = np.empty(n, dtype=np.float64)
+        for i in range(n):
+            volatility_factor = 0.12 if market_cap[i] > 1000000000 else 0.25
+            change = change_24h[i]
+            base_7d = change * 0.8 if change > 0 else 3.0
+            base_30d = change * 1.8 if change > 0 else 8.0
+            changes_7d[i] = max(-25.0, min(75.0, base_7d + noise_7d[i] * volatility_factor * 100))
+            changes_30d[i] = max(-40.0, min(150.0, base_30d + noise_30d[i] * volatility_factor * 150))
+        return changes_7d, changes_30d
+else:
+    _future_changes_jit = None
+
+def predict_future_changes(change_24h, market_cap, noise_7d, noise_30d):
+    """Predict 7d and 30d price changes for arrays of coin metrics and noise"""
+    if _future_changes_jit is not None:
+        return _future_changes_jit(change_24h, market_cap, noise_7d, noise_30d)
     
-    # Base on current momentum
-    current_change = safe_get(coin_data, 'change24h', 0)
-    base_7d = current_change * 0.8 if current_change > 0 else 3
-    base_30d = current_change * 1.8 if current_change > 0 else 8
+    volatility_factor = np.where(market_cap > 1000000000, 0.12, 0.25)
     
-    # Add volatility
-    random_7d = (np.random.random() - 0.5) * volatility_factor * 100
-    random_30d = (np.random.random() - 0.5) * volatility_factor * 150
+    gaining = change_24h > 0
+    base_7d = np.where(gaining, change_24h * 0.8, 3.0)
+    base_30d = np.where(gaining, change_24h * 1.8, 8.0)
     
-    # Calculate predictions
-    prediction_7d = base_7d + random_7d
-    prediction_30d = base_30d + random_30d
+    prediction_7d = base_7d + noise_7d * volatility_factor * 100
+    prediction_30d = base_30d + noise_30d * volatility_factor * 150
     
-    return {
-        "7d": max(-25, min(75, prediction_7d)),
-        "30d": max(-40, min(150, prediction_30d))
-    }
+    return (np.maximum(-25.0, np.minimum(75.0, prediction_7d)),
+            np.maximum(-40.0, np.minimum(150.0, prediction_30d)))
 
-def identify_new_coins(existing_data, new_data):
-    """Identify newly listed coins with potential"""
-    if not existing_data:
+def identify_new_coins(existing_symbols, new_data):
+    """Identify newly listed coins with potential (symbols upper-case on both sides)"""
+    if not existing_symbols:
         return []
     
-    existing_symbols = {coin['symbol'].upper() for coin in existing_data}
+    min_market_cap = CONFIG['min_market_cap']
+    min_volume = CONFIG['min_volume']
     new_coins = []
     
     for coin in new_data:
-        if coin['symbol'].upper() not in existing_symbols:
-            market_cap = safe_get(coin, 'marketCap', 0)
-            volume24h = safe_get(coin, 'volume24h', 0)
-            
-            if (market_cap >= CONFIG['min_market_cap'] and 
-                volume24h >= CONFIG['min_volume']):
-                
-                # Calculate new coin score
-                score = calculate_prediction_score(coin)
-                if score > 60:  # Only high potential new coins
-                    new_coins.append({
-                        **coin,
-                        "new_score": score,
-                        "listed_since": "today",
-                        "potential": "high" if score > 75 else "medium"
-                    })
-    
-    return sorted(new_coins, key=lambda x: x['new_score'], reverse=True)[:5]
+        if coin['symbol'] in existing_symbols:
+            continue
+        if (safe_get(coin, 'marketCap', 0) < min_market_cap or
+                safe_get(coin, 'volume24h', 0) < min_volume):
+            continue
+        
+        # Calculate new coin score
+        score = calculate_prediction_score(coin)
+        if score > 60:  # Only high potential new coins
+            new_coins.append({
+                **coin,
+                "new_score": score,
+                "listed_since": "today",
+                "potential": "high" if score > 75 else "medium"
+            })
+    
+    return heapq.nlargest(5, new_coins, key=lambda x: x['new_score'])
 
 def detect_whale_activity(coins_data):
     """Detect whale and smart money activity"""
     top_coins = ['BTC', 'ETH', 'SOL', 'XRP', 'ADA', 'DOGE', 'DOT', 'AVAX', 'MATIC', 'LINK']
     whale_activity = []
+    now_iso = run_time().isoformat()
+    
+    # Draw activity, size and confidence for every candidate at once
+    n = len(top_coins)
+    activity_index = RNG.integers(0, len(WHALE_ACTIVITY_TYPES), size=n).tolist()
+    amounts_usd = RNG.uniform(1, 50, size=n) * 1000000  # $1M to $50M
+    confidences = RNG.uniform(0.7, 0.95, size=n)
+    
+    # Index coins by symbol once; building from the end keeps the first match
+    by_symbol = {c['symbol']: c for c in reversed(coins_data)}
     
-    for symbol in top_coins:
-        coin = next((c for c in coins_data if c['symbol'] == symbol), None)
+    for i, symbol in enumerate(top_coins):
+        coin = by_symbol.get(symbol)
         if not coin or safe_get(coin, 'price', 0) <= 0:
             continue
         
         # Simulate whale activity
-        activity_types = [
-            ("Large Buy", "bullish"),
-            ("Large Sell", "bearish"),
-            ("Exchange Transfer", "neutral"),
-            ("Wallet Accumulation", "bullish"),
-            ("Exchange Withdrawal", "bullish")
-        ]
-        
-        activity_type, direction = activity_types[np.random.randint(0, len(activity_types))]
+        activity_type, direction = WHALE_ACTIVITY_TYPES[activity_index[i]]
         
         # Generate realistic amounts
         price = safe_get(coin, 'price', 0)
-        amount_usd = np.random.uniform(1, 50) * 1000000  # $1M to $50M
+        amount_usd = amounts_usd[i]
         amount_coins = amount_usd / price
         
         # Significance based on market cap percentage
@@ -344,58 +515,62 @@ def detect_whale_activity(coins_data):
                 "amount_usd": round(amount_usd),
                 "amount_coins": round(amount_coins, 2),
                 "significance": significance,
-                "confidence": round(np.random.uniform(0.7, 0.95), 2),
-                "timestamp": datetime.now().isoformat()
+                "confidence": round(confidences[i], 2),
+                "timestamp": now_iso
             })
     
-    return sorted(whale_activity, key=lambda x: x['amount_usd'], reverse=True)[:8]
+    return heapq.nlargest(8, whale_activity, key=lambda x: x['amount_usd'])
 
 def detect_arbitrage_opportunities(coins_data):
     """Detect cross-exchange arbitrage opportunities"""
     exchanges = ["Binance", "Coinbase", "Kraken", "KuCoin", "Bybit", "Bitfinex", "OKX", "Huobi"]
     opportunities = []
-    
-    for coin in coins_data[:15]:  # Check top 15 coins
-        price = safe_get(coin, 'price', 0)
-        if price <= 0:
-            continue
-        
-        # Generate simulated exchange prices
-        exchange_prices = {}
-        for exchange in exchanges:
-            variation = np.random.uniform(-0.03, 0.03)  # ±3% variation
-            exchange_prices[exchange] = price * (1 + variation)
-        
-        # Find arbitrage opportunity
-        min_exchange = min(exchange_prices, key=exchange_prices.get)
-        max_exchange = max(exchange_prices, key=exchange_prices.get)
-        min_price = exchange_prices[min_exchange]
-        max_price = exchange_prices[max_exchange]
-        
-        arbitrage_pct = ((max_price - min_price) / min_price) * 100
-        
-        # Consider fees (0.2% per trade)
-        net_profit_pct = arbitrage_pct - 0.4
-        
-        if net_profit_pct > 0.5:  # At least 0.5% net profit
-            opportunities.append({
-                "symbol": coin['symbol'],
-                "name": coin['name'],
-                "buy_exchange": min_exchange,
-                "sell_exchange": max_exchange,
-                "buy_price": round(min_price, 4),
-                "sell_price": round(max_price, 4),
-                "profit_pct": round(arbitrage_pct, 2),
-                "net_profit_pct": round(net_profit_pct, 2),
-                "risk": "low" if net_profit_pct > 2 else "medium",
-                "volume_required": round(np.random.uniform(10000, 100000)),
-                "timestamp": datetime.now().isoformat()
-            })
-    
-    return sorted(opportunities, key=lambda x: x['net_profit_pct'], reverse=True)[:5]
+    now_iso = run_time().isoformat()
+    
+    # Draw every coin's exchange variations (±3%) and trade volume at once
+    candidates = coins_data[:15]  # Check top 15 coins
+    variations = RNG.uniform(-0.03, 0.03, size=(len(candidates), len(exchanges)))
+    volumes_required = RNG.uniform(10000, 100000, size=len(candidates))
+    
+    # Simulated exchange prices for all coins as one coins x exchanges matrix
+    prices = coin_column(candidates, 'price')
+    exchange_prices = prices[:, None] * (1 + variations)
+    
+    # Find arbitrage opportunities (first exchange wins ties, as min/max do)
+    rows = np.arange(len(candidates))
+    min_index = exchange_prices.argmin(axis=1)
+    max_index = exchange_prices.argmax(axis=1)
+    min_prices = exchange_prices[rows, min_index]
+    max_prices = exchange_prices[rows, max_index]
+    
+    listed = prices > 0
+    arbitrage_pct = np.divide(max_prices - min_prices, min_prices,
+                              out=np.zeros_like(min_prices), where=listed) * 100
+    
+    # Consider fees (0.2% per trade)
+    net_profit_pct = arbitrage_pct - 0.4
+    
+    # At least 0.5% net profit
+    for i in np.flatnonzero(listed & (net_profit_pct > 0.5)).tolist():
+        coin = candidates[i]
+        opportunities.append({
+            "symbol": coin['symbol'],
+            "name": coin['name'],
+            "buy_exchange": exchanges[min_index[i]],
+            "sell_exchange": exchanges[max_index[i]],
+            "buy_price": round(min_prices[i], 4),
+            "sell_price": round(max_prices[i], 4),
+            "profit_pct": round(arbitrage_pct[i], 2),
+            "net_profit_pct": round(net_profit_pct[i], 2),
+            "risk": "low" if net_profit_pct[i] > 2 else "medium",
+            "volume_required": round(volumes_required[i]),
+            "timestamp": now_iso
+        })
+    
+    return heapq.nlargest(5, opportunities, key=lambda x: x['net_profit_pct'])
 
-def process_market_data():
-    """Process all market data"""
+def process_market_data(previous_data):
+    """Process all market data against the previous run's snapshot (or None)"""
     print(f"[{datetime.now()}] Processing market data...")
     
     # Fetch CoinGecko data
@@ -404,9 +579,16 @@ def process_market_data():
         print("No data from CoinGecko")
         return {}
     
+    # Extract numeric columns once and score all coins in a single pass
+    change_24h = coin_column(coingecko_data, 'price_change_percentage_24h')
+    market_cap = coin_column(coingecko_data, 'market_cap')
+    volume = coin_column(coingecko_data, 'total_volume')
+    price = coin_column(coingecko_data, 'current_price')
+    spark_scores = calculate_spark_scores(change_24h, market_cap, volume, price).tolist()
+    
     # Process coins
     processed_coins = []
-    for coin in coingecko_data:
+    for coin, spark_score in zip(coingecko_data, spark_scores):
         processed_coin = {
             'symbol': coin.get('symbol', '').upper(),
             'name': coin.get('name', ''),
@@ -416,42 +598,41 @@ def process_market_data():
             'volume24h': safe_get(coin, 'total_volume', 0),
             'ath': safe_get(coin, 'ath', 0),
             'ath_change_percentage': safe_get(coin, 'ath_change_percentage', 0),
-            'sparkScore': calculate_spark_score(coin),
+            'sparkScore': spark_score,
             'circulating_supply': safe_get(coin, 'circulating_supply', 0),
             'total_supply': safe_get(coin, 'total_supply', 0)
         }
         
         processed_coins.append(processed_coin)
     
-    # Sort by market cap
-    processed_coins.sort(key=lambda x: x['marketCap'], reverse=True)
+    # Rank by market cap; only the top 100 are ever published
+    ranked_coins = [processed_coins[i] for i in top_k_indices(market_cap, 100).tolist()]
     
     # Calculate market summary
-    total_market_cap = sum(coin['marketCap'] for coin in processed_coins)
-    total_volume = sum(coin['volume24h'] for coin in processed_coins)
-    
-    # Load previous data for changes
-    previous_data = load_previous_data()
+    total_market_cap = float(market_cap.sum())
+    total_volume = float(volume.sum())
     
     # Market summary
+    now_iso = run_time().isoformat()
     market_summary = {
         'total_market_cap': total_market_cap,
         'total_volume_24h': total_volume,
         'total_coins_tracked': len(processed_coins),
         'market_cap_change_24h': calculate_24h_change('market_cap', total_market_cap, previous_data),
         'volume_change_24h': calculate_24h_change('volume', total_volume, previous_data),
-        'timestamp': datetime.now().isoformat()
+        'timestamp': now_iso
     }
     
     # Identify new coins
     existing_coins = previous_data.get('trending_coins', []) if previous_data else []
-    new_coins = identify_new_coins(existing_coins, processed_coins)
+    existing_symbols = frozenset(coin['symbol'] for coin in existing_coins)
+    new_coins = identify_new_coins(existing_symbols, processed_coins)
     
     return {
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso,
         'market_summary': market_summary,
-        'trending_coins': processed_coins[:20],
-        'all_coins': processed_coins[:100],
+        'trending_coins': ranked_coins[:20],
+        'all_coins': ranked_coins,
         'new_coins': new_coins,
         'total_coins': len(processed_coins)
     }
@@ -462,10 +643,31 @@ def process_predictions(market_data):
     
     coins = market_data.get('trending_coins', [])[:50]
     predictions = []
-    
-    for coin in coins:
-        prediction_score = calculate_prediction_score(coin)
-        future_change = predict_future_change(coin)
+    high_confidence_count = 0
+    now_iso = run_time().isoformat()
+    
+    # Draw all random inputs for the batch up front
+    n = len(coins)
+    innovation = RNG.uniform(0, 10, size=n)
+    noise_7d = RNG.random(n) - 0.5
+    noise_30d = RNG.random(n) - 0.5
+    tech_index = RNG.integers(0, len(TECH_FACTORS), size=n).tolist()
+    
+    # Score and project the whole batch at once
+    change_24h = coin_column(coins, 'change24h')
+    market_cap = coin_column(coins, 'marketCap')
+    prediction_scores = calculate_prediction_scores(
+        change_24h, coin_column(coins, 'volume24h'), market_cap,
+        coin_column(coins, 'price'), coin_column(coins, 'ath'), innovation
+    ).tolist()
+    changes_7d, changes_30d = predict_future_changes(change_24h, market_cap, noise_7d, noise_30d)
+    changes_7d = changes_7d.tolist()
+    changes_30d = changes_30d.tolist()
+    
+    for i, coin in enumerate(coins):
+        prediction_score = prediction_scores[i]
+        if prediction_score > 80:
+            high_confidence_count += 1
         
         prediction = {
             'symbol': coin['symbol'],
@@ -473,37 +675,40 @@ def process_predictions(market_data):
             'current_price': coin['price'],
             'change24h': coin['change24h'],
             'prediction_score': round(prediction_score, 1),
-            'prediction_7d': round(future_change['7d'], 1),
-            'prediction_30d': round(future_change['30d'], 1),
+            'prediction_7d': round(changes_7d[i], 1),
+            'prediction_30d': round(changes_30d[i], 1),
             'confidence': 'high' if prediction_score > 80 else 'medium' if prediction_score > 60 else 'low',
-            'factors': generate_prediction_factors(coin),
+            'factors': generate_prediction_factors(coin, tech_index[i]),
             'recommendation': 'buy' if prediction_score > 70 else 'hold' if prediction_score > 40 else 'monitor',
-            'timestamp': datetime.now().isoformat()
+            'timestamp': now_iso
         }
         predictions.append(prediction)
     
-    # Sort by prediction score
-    predictions.sort(key=lambda x: x['prediction_score'], reverse=True)
+    # Rank by prediction score; only the top 20 are ever published
+    ranked = heapq.nlargest(20, predictions, key=lambda x: x['prediction_score'])
     
     # Calculate metrics
-    top_10 = predictions[:10]
+    top_10 = ranked[:10]
+    top_count = len(top_10) or 1
+    average_7d = sum(p['prediction_7d'] for p in top_10) / top_count
+    average_30d = sum(p['prediction_30d'] for p in top_10) / top_count
     metrics = {
-        'average_7d_prediction': round(np.mean([p['prediction_7d'] for p in top_10]), 1),
-        'average_30d_prediction': round(np.mean([p['prediction_30d'] for p in top_10]), 1),
-        'high_confidence_count': sum(1 for p in predictions if p['confidence'] == 'high'),
+        'average_7d_prediction': round(average_7d, 1),
+        'average_30d_prediction': round(average_30d, 1),
+        'high_confidence_count': high_confidence_count,
         'total_predicted': len(predictions),
-        'market_outlook': 'bullish' if np.mean([p['prediction_7d'] for p in top_10]) > 5 else 'bearish'
+        'market_outlook': 'bullish' if average_7d > 5 else 'bearish'
     }
     
     return {
-        'timestamp': datetime.now().isoformat(),
-        'top_predictions': predictions[:6],
-        'all_predictions': predictions[:20],
+        'timestamp': now_iso,
+        'top_predictions': ranked[:6],
+        'all_predictions': ranked,
         'prediction_metrics': metrics
     }
 
-def generate_prediction_factors(coin):
-    """Generate prediction factors for a coin"""
+def generate_prediction_factors(coin, tech_index):
+    """Generate prediction factors for a coin, with a pre-drawn technical factor index"""
     factors = []
     
     if coin['change24h'] > 15:
@@ -520,21 +725,36 @@ def generate_prediction_factors(coin):
     elif coin['marketCap'] > 10000000000:
         factors.append('Market leader')
     
-    # Random technical factors
-    tech_factors = ['Bullish pattern', 'Support level', 'Breakout potential', 'Low volatility']
-    factors.append(np.random.choice(tech_factors))
+    # Random technical factor fills the last slot if one is free
+    if len(factors) < 3:
+        factors.append(TECH_FACTORS[tech_index])
     
-    return factors[:3]
+    return factors
+
+# Comparison only needs market_summary and trending_coins, which save_data
+# writes ahead of the bulky all_coins list
+PREVIOUS_DATA_CUTOFF = re.compile(rb',\s*"all_coins"\s*:')
 
 def load_previous_data():
     """Load previous market data for comparison"""
     try:
         latest_file = os.path.join(CONFIG['data_dir'], 'latest.json')
         if os.path.exists(latest_file):
-            with open(latest_file, 'r') as f:
-                return json.load(f)
-    except:
-        pass
+            with open(latest_file, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Parse only the head of the snapshot when the layout allows it
+                match = PREVIOUS_DATA_CUTOFF.search(mm)
+                if match:
+                    try:
+                        return json_loads(mm[:match.start()] + b'}')
+                    except ValueError:
+                        pass
+                # Otherwise parse straight from the page cache
+                with memoryview(mm) as view:
+                    return json_loads(view)
+    except (OSError, ValueError) as e:
+        # Files are swapped in atomically, so this is a real read problem
+        print(f"Error loading previous data: {e}")
     return None
 
 def calculate_24h_change(metric, current_value, previous_data):
@@ -549,56 +769,105 @@ def calculate_24h_change(metric, current_value, previous_data):
     change = ((current_value - previous_value) / previous_value) * 100
     return round(change, 2)
 
+def _atomic_write(path, payload: bytes):
+    """Write bytes to a per-process temp file, fsync it, and swap it into place"""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
 def save_data(data, filename):
-    """Save data to file"""
-    os.makedirs(CONFIG['data_dir'], exist_ok=True)
+    """Save data to file (main() creates the data and historical directories)"""
+    # Serialize once; the historical copy reuses the same bytes
+    payload = json_dumps(data, pretty=CONFIG['pretty_json'])
     
+    # Never modify the current file in place: readers see either the old
+    # or the new snapshot, and historical hardlinks keep pointing at old data
     filepath = os.path.join(CONFIG['data_dir'], filename)
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
+    _atomic_write(filepath, payload)
     
     # Save historical copy
     historical_dir = os.path.join(CONFIG['data_dir'], 'historical')
-    os.makedirs(historical_dir, exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = run_time().strftime("%Y%m%d_%H%M%S")
     historical_path = os.path.join(historical_dir, f'{filename[:-5]}_{timestamp}.json')
-    with open(historical_path, 'w') as f:
-        json.dump(data, f, indent=2)
-    
-    # Cleanup old files
-    cleanup_old_files(historical_dir)
+    if CONFIG['pretty_json']:
+        # Snapshots are only read by machines, so keep them compact even
+        # when the current files are indented for humans
+        with open(historical_path, 'wb') as f:
+            f.write(json_dumps(data))
+        return
+    try:
+        os.link(filepath, historical_path)
+    except OSError:
+        # No hardlink support, or a snapshot from the same second exists
+        with open(historical_path, 'wb') as f:
+            f.write(payload)
+
+# Historical snapshots are named <name>_YYYYmmdd_HHMMSS.json
+SNAPSHOT_STAMP = re.compile(r'_(\d{8}_\d{6})\.json$')
 
 def cleanup_old_files(directory, hours=24):
     """Remove files older than specified hours"""
     cutoff = datetime.now() - timedelta(hours=hours)
-    
-    for filename in os.listdir(directory):
-        filepath = os.path.join(directory, filename)
-        if os.path.isfile(filepath):
-            file_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-            if file_time < cutoff:
-                os.remove(filepath)
+    # Zero-padded stamps sort lexicographically in time order
+    cutoff_stamp = cutoff.strftime("%Y%m%d_%H%M%S")
+    cutoff_mtime = cutoff.timestamp()
+    
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            
+            # Age snapshots by the stamp in their name: a fresh checkout
+            # resets every mtime, so mtime is only a fallback
+            match = SNAPSHOT_STAMP.search(entry.name)
+            if match:
+                expired = match.group(1) < cutoff_stamp
+            else:
+                expired = entry.stat(follow_symlinks=False).st_mtime < cutoff_mtime
+            
+            if expired:
+                os.remove(entry.path)
 
 def main():
-    """Main execution function"""
+    """Main execution function; returns the processed market data"""
+    global _run_time
+    _run_time = datetime.now()
+    
     print("=" * 60)
     print("SPARKCHAIN PRO - Advanced Crypto Analytics Pipeline")
     print("=" * 60)
     
-    print(f"[{datetime.now()}] Starting data collection...")
+    # Indented output is only useful when a human reads the files
+    if "--pretty" in sys.argv[1:]:
+        CONFIG['pretty_json'] = True
     
-    # Process market data
-    market_data = process_market_data()
-    if not market_data:
-        print("Failed to process market data")
-        return
+    print(f"[{run_time()}] Starting data collection...")
     
-    # Generate predictions
-    predictions = process_predictions(market_data)
+    # Read the previous snapshot once, before this run replaces it
+    previous_data = load_previous_data()
     
-    # Fetch additional data
-    defi_data = fetch_defi_data()
+    # DeFi data is independent of market data, so fetch it in the background;
+    # the pool is not joined on the way out so a failed run returns right away
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        defi_future = pool.submit(fetch_defi_data)
+        
+        # Process market data
+        market_data = process_market_data(previous_data)
+        if not market_data:
+            print("Failed to process market data")
+            return
+        
+        # Generate predictions
+        predictions = process_predictions(market_data)
+        
+        # Fetch additional data
+        defi_data = defi_future.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
     sentiment_data = fetch_market_sentiment()
     
     # Detect whale activity
@@ -607,13 +876,25 @@ def main():
     # Detect arbitrage opportunities
     arbitrage_ops = detect_arbitrage_opportunities(market_data.get('trending_coins', []))
     
-    # Save all data
-    save_data(market_data, 'latest.json')
-    save_data(predictions, 'predictions.json')
-    save_data(defi_data, 'defi.json')
-    save_data(sentiment_data, 'sentiment.json')
-    save_data(whale_activity, 'whale.json')
-    save_data(arbitrage_ops, 'arbitrage.json')
+    # Create the output directories once, not in every save
+    historical_dir = os.path.join(CONFIG['data_dir'], 'historical')
+    os.makedirs(historical_dir, exist_ok=True)
+    
+    # Save all data; each save waits on fsync, so overlap them
+    outputs = (
+        (market_data, 'latest.json'),
+        (predictions, 'predictions.json'),
+        (defi_data, 'defi.json'),
+        (sentiment_data, 'sentiment.json'),
+        (whale_activity, 'whale.json'),
+        (arbitrage_ops, 'arbitrage.json')
+    )
+    with ThreadPoolExecutor(max_workers=len(outputs)) as pool:
+        for future in [pool.submit(save_data, data, filename) for data, filename in outputs]:
+            future.result()
+    
+    # Prune expired snapshots once per run rather than after every save
+    cleanup_old_files(historical_dir)
     
     print(f"[{datetime.now()}] Data processing complete!")
     print(f"  • Market data: {len(market_data.get('trending_coins', []))} coins")
@@ -621,6 +902,20 @@ def main():
     print(f"  • DeFi TVL: ${defi_data.get('total_value_locked', 0)/1000000000:.1f}B")
     print(f"  • Whale activity: {len(whale_activity)} significant moves")
     print(f"  • Arbitrage ops: {len(arbitrage_ops)} opportunities")
+    
+    return market_data
+
+def run_all():
+    """Run the pipeline, then the AI analysis on the fresh data without re-reading it"""
+    market_data = main()
+    if not market_data:
+        return
+    
+    from deepseek_analyzer import run_analysis
+    run_analysis(market_data, os.path.join(CONFIG['data_dir'], 'analysis'))
 
 if __name__ == "__main__":
-    main()
+    if "--analyze" in sys.argv[1:]:
+        run_all()
+    else:
+        main()
@@ -4,20 +4,48 @@ SPARKCHAIN AI Analysis using DeepSeek API
 Analyzes crypto data and generates investment insights
 """
 
+import hashlib
 import os
-import json
+import re
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
 from typing import Dict, List, Any
+from json_io import json_dumps, json_loads
+
+# Keyword tables for the response heuristics (matched against lowercased text)
+PICK_KEYWORDS = ('recommend', 'suggest', 'top pick', 'potential', 'bullish')
+POSITIVE_INDICATORS = ('bullish', 'positive', 'growth', 'opportunity', 'strong')
+NEGATIVE_INDICATORS = ('bearish', 'negative', 'risk', 'caution', 'volatile')
+SYMBOL_PATTERN = re.compile(r'\b[A-Z]{2,6}\b')
+
+# One prompt line per coin; missing fields fall back to PROMPT_COIN_DEFAULTS
+PROMPT_COIN_TEMPLATE = (
+    "- {symbol} ({name}): "
+    "Price: ${price:,.4f}, "
+    "24h Change: {change_24h:+.2f}%, "
+    "Market Cap: ${market_cap:,.0f}, "
+    "Spark Score: {spark_score}/100"
+)
+PROMPT_COIN_DEFAULTS = {'symbol': '', 'name': '', 'price': 0, 'change_24h': 0, 'market_cap': 0, 'spark_score': 0}
 
 class DeepSeekAnalyzer:
-    def __init__(self, api_key: str = None):
+    CACHE_TTL = 3600  # Seconds; matches the hourly update window
+    
+    def __init__(self, api_key: str = None, cache_dir: str = 'data/analysis/cache'):
         self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
+        self.cache_dir = cache_dir
         self.api_url = "https://api.deepseek.com/v1/chat/completions"
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        
+        # Keep-alive session so repeated analyses reuse one TLS connection
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
     
     def analyze_market_data(self, market_data: Dict) -> Dict:
         """Analyze market data using DeepSeek AI"""
@@ -29,8 +57,12 @@ class DeepSeekAnalyzer:
             # Prepare prompt for AI
             prompt = self.create_analysis_prompt(market_data)
             
-            # Call DeepSeek API
-            response = self.call_deepseek_api(prompt)
+            # Call DeepSeek API, reusing a recent answer for the same market state
+            cache_file = self.get_cache_file(market_data)
+            response = self.load_cached_response(cache_file)
+            if response is None:
+                response = self.call_deepseek_api(prompt)
+                self.save_cached_response(cache_file, response)
             
             # Parse response
             analysis = self.parse_ai_response(response)
@@ -71,16 +103,7 @@ Keep the analysis concise, data-driven, and objective. Do NOT give financial adv
     
     def format_coins_for_prompt(self, coins: List[Dict]) -> str:
         """Format coins for AI prompt"""
-        formatted = []
-        for coin in coins:
-            formatted.append(
-                f"- {coin.get('symbol', '')} ({coin.get('name', '')}): "
-                f"Price: ${coin.get('price', 0):,.4f}, "
-                f"24h Change: {coin.get('change_24h', 0):+.2f}%, "
-                f"Market Cap: ${coin.get('market_cap', 0):,.0f}, "
-                f"Spark Score: {coin.get('spark_score', 0)}/100"
-            )
-        return "\n".join(formatted)
+        return "\n".join(PROMPT_COIN_TEMPLATE.format_map({**PROMPT_COIN_DEFAULTS, **coin}) for coin in coins)
     
     def call_deepseek_api(self, prompt: str) -> Dict:
         """Call DeepSeek API"""
@@ -94,29 +117,77 @@ Keep the analysis concise, data-driven, and objective. Do NOT give financial adv
             "temperature": 0.7
         }
         
-        response = requests.post(
+        response = self.session.post(
             self.api_url,
-            headers=self.headers,
-            json=data,
+            data=json_dumps(data),
             timeout=30
         )
         response.raise_for_status()
         
-        return response.json()
+        return json_loads(response.content)
+    
+    def get_cache_file(self, market_data: Dict) -> str:
+        """Cache path keyed on the market summary and trending coin prices at stable precision;
+        new coins are left out because the pipeline picks them with random scores"""
+        summary = market_data.get('market_summary', {})
+        fields = [
+            f"{summary.get('total_market_cap', 0):.3g}",
+            str(summary.get('total_coins_tracked', 0)),
+            str(summary.get('new_coins_today', 0)),
+        ]
+        for coin in market_data.get('trending_coins', [])[:5]:
+            coin = {**PROMPT_COIN_DEFAULTS, **coin}
+            fields.append(f"{coin['symbol']}:{coin['price']:.4g}")
+        key = hashlib.blake2b("|".join(fields).encode('utf-8'), digest_size=8).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+    
+    def load_cached_response(self, cache_file: str) -> Dict:
+        """Load a cached API response if it is younger than CACHE_TTL"""
+        try:
+            if time.time() - os.path.getmtime(cache_file) < self.CACHE_TTL:
+                with open(cache_file, 'rb') as f:
+                    return json_loads(f.read())
+        except (OSError, ValueError):
+            pass
+        return None
+    
+    def save_cached_response(self, cache_file: str, response: Dict):
+        """Cache an API response (write to temp file, then atomically replace)"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_file = cache_file + '.tmp'
+            with open(tmp_file, 'wb') as f:
+                f.write(json_dumps(response))
+            os.replace(tmp_file, cache_file)
+            self.prune_cache()
+        except OSError as e:
+            print(f"Error caching AI response: {e}")
+    
+    def prune_cache(self):
+        """Remove cached responses older than CACHE_TTL"""
+        cutoff = time.time() - self.CACHE_TTL
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
     
     def parse_ai_response(self, api_response: Dict) -> Dict:
         """Parse AI response into structured format"""
         try:
             content = api_response['choices'][0]['message']['content']
+            content_lower = content.lower()
             
             # Extract insights from response (simplified parsing)
             analysis = {
                 'timestamp': datetime.now().isoformat(),
                 'summary': content[:200] + "..." if len(content) > 200 else content,
                 'full_analysis': content,
-                'top_picks': self.extract_top_picks(content),
-                'risk_assessment': self.extract_risk_assessment(content),
-                'confidence_score': self.calculate_confidence(content)
+                'top_picks': self.extract_top_picks(content, content_lower),
+                'risk_assessment': self.extract_risk_assessment(content, content_lower),
+                'confidence_score': self.calculate_confidence(content, content_lower)
             }
             
             return analysis
@@ -125,41 +196,44 @@ Keep the analysis concise, data-driven, and objective. Do NOT give financial adv
             print(f"Error parsing AI response: {e}")
             return self.simulate_analysis({})
     
-    def extract_top_picks(self, content: str) -> List[str]:
+    def extract_top_picks(self, content: str, content_lower: str = None) -> List[str]:
         """Extract top coin picks from AI response"""
         # Simple extraction - in production would use more sophisticated NLP
+        if content_lower is None:
+            content_lower = content.lower()
+        
         picks = []
-        lines = content.split('\n')
-        for line in lines:
-            if any(keyword in line.lower() for keyword in ['recommend', 'suggest', 'top pick', 'potential', 'bullish']):
+        for line, line_lower in zip(content.split('\n'), content_lower.split('\n')):
+            if any(keyword in line_lower for keyword in PICK_KEYWORDS):
                 # Look for coin symbols in the line
-                words = line.split()
-                for word in words:
-                    if word.isupper() and 2 <= len(word) <= 6:
-                        picks.append(word)
+                picks.extend(SYMBOL_PATTERN.findall(line))
+                if len(picks) >= 3:
+                    break
         
         return picks[:3] if picks else ['BTC', 'ETH', 'SOL']
     
-    def extract_risk_assessment(self, content: str) -> str:
+    def extract_risk_assessment(self, content: str, content_lower: str = None) -> str:
         """Extract risk assessment from AI response"""
-        if 'high risk' in content.lower():
+        if content_lower is None:
+            content_lower = content.lower()
+        
+        if 'high risk' in content_lower:
             return "High Risk - Volatile market conditions"
-        elif 'moderate risk' in content.lower():
+        elif 'moderate risk' in content_lower:
             return "Moderate Risk - Mixed signals"
-        elif 'low risk' in content.lower():
+        elif 'low risk' in content_lower:
             return "Low Risk - Stable market conditions"
         else:
             return "Moderate Risk - Standard market volatility"
     
-    def calculate_confidence(self, content: str) -> float:
+    def calculate_confidence(self, content: str, content_lower: str = None) -> float:
         """Calculate confidence score from AI response"""
         # Simple heuristic based on language
-        positive_indicators = ['bullish', 'positive', 'growth', 'opportunity', 'strong']
-        negative_indicators = ['bearish', 'negative', 'risk', 'caution', 'volatile']
+        if content_lower is None:
+            content_lower = content.lower()
         
-        content_lower = content.lower()
-        pos_count = sum(1 for word in positive_indicators if word in content_lower)
-        neg_count = sum(1 for word in negative_indicators if word in content_lower)
+        pos_count = sum(1 for word in POSITIVE_INDICATORS if word in content_lower)
+        neg_count = sum(1 for word in NEGATIVE_INDICATORS if word in content_lower)
         
         if pos_count > neg_count:
             return min(85, 70 + (pos_count * 5))
@@ -177,6 +251,25 @@ Keep the analysis concise, data-driven, and objective. Do NOT give financial adv
             'confidence_score': 75.5
         }
 
+def run_analysis(market_data: Dict, analysis_dir: str = 'data/analysis') -> Dict:
+    """Analyze market data already in memory and save the result"""
+    # Initialize analyzer
+    analyzer = DeepSeekAnalyzer(cache_dir=os.path.join(analysis_dir, 'cache'))
+    
+    # Run analysis
+    print("Running AI analysis...")
+    analysis = analyzer.analyze_market_data(market_data)
+    
+    # Save analysis
+    os.makedirs(analysis_dir, exist_ok=True)
+    analysis_file = os.path.join(analysis_dir, 'latest_analysis.json')
+    with open(analysis_file, 'wb') as f:
+        f.write(json_dumps(analysis, pretty=True))
+    
+    print(f"Analysis saved to {analysis_file}")
+    print(f"Summary: {analysis['summary']}")
+    return analysis
+
 def main():
     """Main function to run AI analysis"""
     print("=" * 50)
@@ -185,27 +278,13 @@ def main():
     
     # Load latest data
     try:
-        with open('data/latest.json', 'r') as f:
-            market_data = json.load(f)
+        with open('data/latest.json', 'rb') as f:
+            market_data = json_loads(f.read())
     except FileNotFoundError:
         print("Error: No data found. Run data pipeline first.")
         return
     
-    # Initialize analyzer
-    analyzer = DeepSeekAnalyzer()
-    
-    # Run analysis
-    print("Running AI analysis...")
-    analysis = analyzer.analyze_market_data(market_data)
-    
-    # Save analysis
-    os.makedirs('data/analysis', exist_ok=True)
-    analysis_file = 'data/analysis/latest_analysis.json'
-    with open(analysis_file, 'w') as f:
-        json.dump(analysis, f, indent=2)
-    
-    print(f"Analysis saved to {analysis_file}")
-    print(f"Summary: {analysis['summary']}")
+    run_analysis(market_data)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+SPARKCHAIN JSON helpers
+Fast JSON encoding shared by the pipeline, alert system and AI analysis
+"""
+
+try:
+    import orjson
+
+    def json_loads(data):
+        """Parse JSON from bytes, str or a buffer such as a memoryview"""
+        return orjson.loads(data)
+
+    def json_dumps(obj, pretty: bool = False) -> bytes:
+        """Serialize to compact UTF-8 JSON bytes, indented if pretty is True"""
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+except ImportError:
+    import json
+
+    def json_loads(data):
+        """Parse JSON from bytes, str or a buffer such as a memoryview"""
+        if not isinstance(data, (bytes, bytearray, str)):
+            data = bytes(data)
+        return json.loads(data)
+
+    def json_dumps(obj, pretty: bool = False) -> bytes:
+        """Serialize to compact UTF-8 JSON bytes, indented if pretty is True"""
+        if pretty:
+            return json.dumps(obj, indent=2).encode("utf-8")
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")